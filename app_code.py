@@ -7,85 +7,45 @@ Features:
 - Per-employee token links for employee view
 - Manager copies a message for manual WhatsApp/SMS sending
 - Employees open link (with ?token=...) to see today's tasks, upload photo proof and mark complete
-- Local persistence: data.json + uploads/ directory
+- Local persistence: data.json + uploads/ directory (see shift_manager_core)
 """
 import streamlit as st
 from uuid import uuid4
 from pathlib import Path
-from datetime import date, datetime
-import json
-import urllib.parse
-
-# ---------------- Config ----------------
-DATA_FILE = Path("data.json")
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
-# ---------------- Persistence helpers ----------------
-def load_data():
-    if not DATA_FILE.exists():
-        # initial 6 empty employees
-        employees = [
-            {"id": str(i+1), "name": f"Employee {i+1}", "phone": "", "email": "", "token": str(uuid4())}
-            for i in range(6)
-        ]
-        data = {"employees": employees, "tasks": []}
-        save_data(data)
-        return data
-    try:
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    except Exception:
-        # corrupt file fallback
-        return {"employees": [], "tasks": []}
-
-def save_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-# ---------------- Task functions ----------------
-def add_task(employee_id, task_text, shift_label, task_date):
-    data = load_data()
-    task = {
-        "task_id": str(uuid4()),
-        "employee_id": employee_id,
-        "task_text": task_text,
-        "shift": shift_label,
-        "date": task_date.isoformat(),
-        "assigned_at": datetime.utcnow().isoformat(),
-        "completed": False,
-        "proof": None
-    }
-    data["tasks"].append(task)
-    save_data(data)
-    return task
-
-def mark_complete(task_id, proof_fname=None):
-    data = load_data()
-    for t in data["tasks"]:
-        if t["task_id"] == task_id:
-            t["completed"] = True
-            if proof_fname:
-                t["proof"] = proof_fname
-            t["completed_at"] = datetime.utcnow().isoformat()
-            break
-    save_data(data)
-
-def delete_employee(emp_id):
-    data = load_data()
-    # remove employee
-    data["employees"] = [e for e in data["employees"] if e["id"] != emp_id]
-    # optionally remove tasks for that employee
-    data["tasks"] = [t for t in data["tasks"] if t["employee_id"] != emp_id]
-    save_data(data)
+from datetime import date
+import itertools
+import shutil
+
+from shift_manager_core import (
+    UPLOAD_DIR,
+    add_task,
+    delete_employee,
+    get_data,
+    get_indexes,
+    mark_complete,
+    save_data,
+    _flush_now,
+    _list_uploads,
+    _make_wa_link,
+)
 
 # ---------------- Streamlit UI ----------------
 st.set_page_config(page_title="Simple Shift Manager v2", layout="wide")
 st.title("👷 Simple Shift Manager v2 — Tabbed Dashboard")
 
-data = load_data()
+data = get_data()
 employees = data.get("employees", [])
-tasks = data.get("tasks", [])
+
+# resolve ?token= once per session; reruns skip the query-params round-trip
+if "_token" not in st.session_state:
+    st.session_state["_token"] = st.experimental_get_query_params().get("token", [None])[0]
+token = st.session_state["_token"]
+if token:
+    token_emp = get_indexes()["emp_by_token"].get(token)
+    if token_emp:
+        st.caption(f"Opened via {token_emp['name']}'s task link.")
+    else:
+        st.caption("Opened via an unrecognized task link.")
 
 # ---- Top info row ----
 col_info1, col_info2 = st.columns([3,1])
@@ -110,8 +70,12 @@ with tab_emp:
             if not new_name.strip():
                 st.error("Name required")
             else:
-                # new id as next integer string, ensure unique
-                next_id = str(max([int(e["id"]) for e in employees] + [0]) + 1)
+                # monotonic counter: O(1) and never reuses an id after deletes
+                if "next_id" not in data:
+                    # migrate older files: seed from the current highest id
+                    data["next_id"] = max([int(e["id"]) for e in employees] + [0]) + 1
+                next_id = str(data["next_id"])
+                data["next_id"] += 1
                 employees.append({
                     "id": next_id,
                     "name": new_name.strip(),
@@ -119,7 +83,7 @@ with tab_emp:
                     "email": new_email.strip(),
                     "token": str(uuid4())
                 })
-                save_data({"employees": employees, "tasks": tasks})
+                save_data(data)
                 st.success(f"Added {new_name.strip()}")
                 st.experimental_rerun()
 
@@ -142,7 +106,8 @@ with tab_emp:
                         emp['name'] = name.strip()
                         emp['phone'] = phone.strip()
                         emp['email'] = email.strip()
-                        save_data({"employees": employees, "tasks": tasks})
+                        save_data(data)
+                        _flush_now()  # durable before the rerun
                         st.success("Saved")
                         st.experimental_rerun()
                     if st.button("Remove", key=f"remove_emp_{emp['id']}"):
@@ -177,18 +142,17 @@ with tab_assign:
     if not base_url:
         st.info("If deploying, open the app URL in browser and copy the link shown below (some dev URLs are partial).")
 
+    # backfill missing tokens in one pass so N employees cost one save, not N
+    missing = [e for e in employees if not e.get("token")]
+    if missing:
+        for e in missing:
+            e["token"] = str(uuid4())
+        save_data(data)
+
+    today_iso = date.today().isoformat()
     for emp in employees:
         st.write(f"**{emp['name']}** — Phone: {emp.get('phone','(not set)')}")
-        if not emp.get("token"):
-            emp["token"] = str(uuid4())
-            save_data({"employees": employees, "tasks": tasks})
-        token = emp["token"]
-        if base_url:
-            link = f"{base_url}?token={token}"
-        else:
-            link = f"?token={token}"
-        msg = f"Hello {emp['name']}, your task for {date.today().isoformat()} is ready. Open: {link}"
-        wa_link = (f"https://wa.me/{emp.get('phone','')}?text={urllib.parse.quote(msg)}") if emp.get('phone') else None
+        link, msg, wa_link = _make_wa_link(emp['name'], emp.get('phone',''), emp["token"], today_iso, base_url)
 
         cols = st.columns([3,4,2])
         cols[0].code(link)
@@ -202,21 +166,36 @@ with tab_assign:
 with tab_today:
     st.header("Today's Tasks & Proofs")
     today_str = date.today().isoformat()
-    tasks_today = [t for t in tasks if t.get("date") == today_str]
+    tasks_today = get_indexes()["tasks_by_date"].get(today_str, [])
     if not tasks_today:
         st.info("No tasks for today.")
     else:
-        for t in tasks_today:
-            emp = next((e for e in employees if e["id"] == t["employee_id"]), {"name": "Unknown"})
+        # render one page at a time so a busy day doesn't draw every task
+        page_size = 20
+        st.session_state.setdefault("task_offset", 0)
+        offset = min(st.session_state["task_offset"], len(tasks_today) - 1)
+        offset -= offset % page_size
+        if len(tasks_today) > page_size:
+            nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+            if nav_prev.button("Previous", disabled=offset == 0, key="task_page_prev"):
+                st.session_state["task_offset"] = offset - page_size
+                st.experimental_rerun()
+            nav_info.write(f"Showing {offset + 1}-{min(offset + page_size, len(tasks_today))} of {len(tasks_today)} tasks")
+            if nav_next.button("Next", disabled=offset + page_size >= len(tasks_today), key="task_page_next"):
+                st.session_state["task_offset"] = offset + page_size
+                st.experimental_rerun()
+        emp_by_id = get_indexes()["emp_by_id"]
+        existing_uploads = _list_uploads(UPLOAD_DIR.stat().st_mtime_ns)
+        for t in itertools.islice(tasks_today, offset, offset + page_size):
+            emp = emp_by_id.get(t["employee_id"], {"name": "Unknown"})
             st.markdown("---")
             st.subheader(f"{t['task_text']} — {emp['name']}")
             st.write(f"Shift: **{t['shift']}** — Assigned: {t.get('assigned_at','-')}")
             if t.get("completed"):
                 st.success("Completed")
                 if t.get("proof"):
-                    p = UPLOAD_DIR / t["proof"]
-                    if p.exists():
-                        st.image(str(p))
+                    if t["proof"] in existing_uploads:
+                        st.image(str(UPLOAD_DIR / t["proof"]))
                     else:
                         st.write("Proof file not found.")
                 st.write(f"Completed at: {t.get('completed_at','-')}")
@@ -230,7 +209,8 @@ with tab_today:
                         ext = Path(uploaded.name).suffix
                         fname = f"{t['task_id']}{ext}"
                         with open(UPLOAD_DIR / fname, "wb") as f:
-                            f.write(uploaded.getbuffer())
+                            # stream in 1 MB chunks; avoids buffering the whole photo in RAM
+                            shutil.copyfileobj(uploaded, f, length=1024*1024)
                     mark_complete(t['task_id'], proof_fname=fname)
                     st.success("Marked complete and saved proof (if uploaded).")
                     st.experimental_rerun()
@@ -0,0 +1,242 @@
+# shift_manager_core.py
+"""
+Shared persistence and task helpers for the Simple Shift Manager apps.
+
+Importing from here means CPython loads/compiles this code once per process
+and every app variant shares the same data cache, debounced writer and lookup
+indexes instead of carrying its own copy.
+"""
+import streamlit as st
+from uuid import uuid4
+from pathlib import Path
+from datetime import datetime
+import atexit
+import functools
+import orjson
+import os
+import sys
+import threading
+import urllib.parse
+
+# ---------------- Config ----------------
+DATA_FILE = Path("data.json")
+UPLOAD_DIR = Path("uploads")
+UPLOAD_DIR.mkdir(exist_ok=True)
+
+# ---------------- Persistence helpers ----------------
+@st.cache_data(show_spinner=False)
+def _load_cached(mtime_ns):
+    # process-wide memoization: keyed on mtime so a changed file re-parses.
+    # read_bytes + orjson skips the TextIOWrapper decode layer entirely
+    return orjson.loads(DATA_FILE.read_bytes())
+
+@st.cache_data(show_spinner=False)
+def _list_uploads(mtime_ns):
+    # one directory listing per change instead of a stat per displayed proof
+    return {p.name for p in UPLOAD_DIR.iterdir()}
+
+def _intern_tasks(data):
+    # equal date/id/shift strings share one copy, so the == in filters and
+    # index lookups hits CPython's identity short-circuit. Tolerate records
+    # missing fields (hand-edited or legacy files still have to load).
+    for t in data.get("tasks", []):
+        for key in ("date", "employee_id", "shift"):
+            value = t.get(key)
+            if isinstance(value, str):
+                t[key] = sys.intern(value)
+    return data
+
+def load_data():
+    if not DATA_FILE.exists():
+        # initial 6 empty employees
+        employees = [
+            {"id": str(i+1), "name": f"Employee {i+1}", "phone": "", "email": "", "token": str(uuid4())}
+            for i in range(6)
+        ]
+        data = {"employees": employees, "tasks": [], "next_id": len(employees) + 1}
+        save_data(data)
+        return data
+    try:
+        data = _load_cached(DATA_FILE.stat().st_mtime_ns)
+    except orjson.JSONDecodeError:
+        # genuinely undecodable file: set it aside so a later flush doesn't
+        # silently overwrite it
+        try:
+            os.replace(DATA_FILE, DATA_FILE.with_suffix(".json.corrupt"))
+        except OSError:
+            pass
+        return {"employees": [], "tasks": []}
+    except Exception:
+        # transient read/cache error: fall back for this rerun but leave the
+        # file alone
+        return {"employees": [], "tasks": []}
+    return _intern_tasks(data)
+
+# Debounced writer state: mutations update the in-memory dict immediately and
+# the file write happens at most once per 500 ms (or at shutdown / on demand).
+# _data_gen counts saves process-wide; each session records the generation its
+# cached dict corresponds to, so other sessions can spot in-flight changes.
+_write_lock = threading.Lock()
+_flush_timer = None
+_pending = None
+_flushed_mtime = None
+_data_gen = 0
+
+def _flush_now():
+    global _flush_timer, _pending, _flushed_mtime
+    with _write_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if _pending is None:
+            return
+        tmp = DATA_FILE.with_suffix(".json.tmp")
+        # compact output: data.json is machine-read; see debug_save() for humans
+        tmp.write_bytes(orjson.dumps(_pending, option=orjson.OPT_NON_STR_KEYS))
+        os.replace(tmp, DATA_FILE)
+        _flushed_mtime = DATA_FILE.stat().st_mtime_ns
+        _pending = None
+        _load_cached.clear()
+
+atexit.register(_flush_now)
+
+def debug_save():
+    # indented dump of the current data for manual inspection
+    path = DATA_FILE.with_suffix(".debug.json")
+    path.write_bytes(orjson.dumps(get_data(), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    return path
+
+def save_data(data):
+    global _flush_timer, _pending, _data_gen
+    # keep the session cache in sync so get_data() doesn't re-read the file
+    _data_gen += 1
+    st.session_state["_data"] = data
+    st.session_state["_data_gen"] = _data_gen
+    st.session_state.pop("_indexes", None)
+    with _write_lock:
+        _pending = data
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+        _flush_timer = threading.Timer(0.5, _flush_now)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+def get_data():
+    # in-memory dict is authoritative while a write is pending
+    if _pending is not None:
+        if st.session_state.get("_data_gen") != _data_gen:
+            # another session's in-flight write: adopt it and drop any
+            # indexes built against this session's stale view
+            st.session_state["_data"] = _pending
+            st.session_state["_data_gen"] = _data_gen
+            st.session_state.pop("_indexes", None)
+        return _pending
+    # cached accessor: only re-parse data.json when its mtime changed
+    if not DATA_FILE.exists():
+        return load_data()
+    mtime = DATA_FILE.stat().st_mtime_ns
+    if st.session_state.get("_data_mtime") == mtime and "_data" in st.session_state:
+        return st.session_state["_data"]
+    if mtime == _flushed_mtime and st.session_state.get("_data_gen") == _data_gen and "_data" in st.session_state:
+        # the debounced write this session already holds just landed; other
+        # sessions (stale generation) fall through and re-read the file
+        st.session_state["_data_mtime"] = mtime
+        return st.session_state["_data"]
+    data = load_data()
+    st.session_state["_data"] = data
+    st.session_state["_data_gen"] = _data_gen
+    st.session_state["_data_mtime"] = mtime
+    st.session_state.pop("_indexes", None)
+    return data
+
+def get_indexes():
+    # O(1) lookup tables over the cached data, rebuilt lazily after mutations
+    idx = st.session_state.get("_indexes")
+    if idx is None:
+        data = get_data()
+        emps = data.get("employees", [])
+        tasks_by_date = {}
+        tasks_by_emp_date = {}
+        task_by_id = {}
+        for t in data.get("tasks", []):
+            # tolerate records missing keys, like _intern_tasks: a record
+            # just stays out of the buckets it can't be filed under
+            t_date = t.get("date")
+            t_id = t.get("task_id")
+            if t_date is not None:
+                tasks_by_date.setdefault(t_date, []).append(t)
+                t_emp = t.get("employee_id")
+                if t_emp is not None:
+                    tasks_by_emp_date.setdefault((t_emp, t_date), []).append(t)
+            if t_id is not None:
+                task_by_id[t_id] = t
+        idx = {
+            "emp_by_id": {e["id"]: e for e in emps},
+            "emp_by_token": {e["token"]: e for e in emps if e.get("token")},
+            "tasks_by_date": tasks_by_date,
+            "tasks_by_emp_date": tasks_by_emp_date,
+            "task_by_id": task_by_id,
+        }
+        st.session_state["_indexes"] = idx
+    return idx
+
+# ---------------- Task functions ----------------
+def add_task(employee_id, task_text, shift_label, task_date):
+    data = get_data()
+    task = {
+        "task_id": str(uuid4()),
+        "employee_id": sys.intern(employee_id),
+        "task_text": task_text,
+        "shift": sys.intern(shift_label),
+        "date": sys.intern(task_date.isoformat()),
+        "assigned_at": datetime.utcnow().isoformat(),
+        "completed": False,
+        "proof": None
+    }
+    data["tasks"].append(task)
+    save_data(data)
+    return task
+
+def mark_complete(task_id, proof_fname=None):
+    data = get_data()
+    t = get_indexes()["task_by_id"].get(task_id)
+    if t is not None:
+        t["completed"] = True
+        if proof_fname:
+            t["proof"] = proof_fname
+        t["completed_at"] = datetime.utcnow().isoformat()
+    save_data(data)
+
+# pre-bound str.format templates: one bytecode dispatch per call instead of
+# re-running the f-string FORMAT_VALUE sequence for every employee
+_MSG_TEMPLATE = "Hello {name}, your task for {today} is ready. Open: {link}".format
+_WA_TEMPLATE = "https://wa.me/{phone}?text={q}".format
+
+# percent-encoded constant segments of the share message; only the name,
+# date and link vary, so quote() never re-scans the fixed text
+_HELLO_Q = urllib.parse.quote("Hello ")
+
+@functools.lru_cache(maxsize=4)
+def _quoted_middle(today_iso):
+    return urllib.parse.quote(f", your task for {today_iso} is ready. Open: ")
+
+@functools.lru_cache(maxsize=64)
+def _make_wa_link(name, phone, token, today_iso, base_url):
+    # share-link assembly is identical across reruns for unchanged employees
+    link = f"{base_url}?token={token}" if base_url else f"?token={token}"
+    msg = _MSG_TEMPLATE(name=name, today=today_iso, link=link)
+    if phone:
+        msg_q = _HELLO_Q + urllib.parse.quote(name) + _quoted_middle(today_iso) + urllib.parse.quote(link)
+        wa_link = _WA_TEMPLATE(phone=phone, q=msg_q)
+    else:
+        wa_link = None
+    return link, msg, wa_link
+
+def delete_employee(emp_id):
+    data = get_data()
+    # remove employee (in place, so cached references stay valid)
+    data["employees"][:] = [e for e in data["employees"] if e["id"] != emp_id]
+    # only rebuild the tasks list if any task actually references the employee
+    if any(t["employee_id"] == emp_id for t in data["tasks"]):
+        data["tasks"][:] = [t for t in data["tasks"] if t["employee_id"] != emp_id]
+    save_data(data)